@@ -4,51 +4,22 @@ data based on predefined reports and save the data in CSV format.
 
 Dependencies:
 - src.analytics_connection.AnalyticsConnection
-- src.report.Report
+- src.report_registry.ReportRegistry
+- src.rollup.Rollup
 """
 from src.analytics_connection import AnalyticsConnection
-from src.report import Report
+from src.report_registry import ReportRegistry
+from src.rollup import Rollup
 
 
 def main():
     """
     The main function to execute the data fetching and saving process.
 
-    It defines a list of reports to be processed, initializes the AnalyticsConnection, 
+    It discovers and validates every report under ./reports, initializes the AnalyticsConnection,
     and iterates over the reports to fetch and save the data for specified view names.
+    The weekly, monthly and yearly rollups of date-keyed reports are then brought up to date.
     """
-    reports = [
-        {"category": "acquisition", "name": "campaigns"},
-        {"category": "acquisition", "name": "channels"},
-        {"category": "acquisition", "name": "referrals"},
-        {"category": "acquisition", "name": "source_medium"},
-        {"category": "audience", "name": "affinity_categories"},
-        {"category": "audience", "name": "age"},
-        {"category": "audience", "name": "branding"},
-        {"category": "audience", "name": "browser"},
-        {"category": "audience", "name": "devices"},
-        {"category": "audience", "name": "gender"},
-        {"category": "audience", "name": "in_market_segmentation"},
-        {"category": "audience", "name": "language"},
-        # {"category": "audience", "name": "location"},
-        {"category": "audience", "name": "new_vs_returning_users"},
-        {"category": "audience", "name": "operating_system"},
-        {"category": "audience", "name": "other_categories"},
-        {"category": "audience", "name": "screen_resolution"},
-
-        {"category": "behavior", "name": "all_pages"},
-        {"category": "behavior", "name": "landing_pages"},
-
-        {"category": "behavior", "name": "search_terms"},
-        {"category": "conversions", "name": "product_performance"},
-        {"category": "conversions", "name": "sales_performance"},
-    ]
-
-    # client = AnalyticsConnection()
-    # report = Report(from_json_file_name=f"reports/{category}/{name}.json")
-    # df = client.getAllData(report)
-    # df.to_csv(f"data/{category}/{name}.csv")
-
     view_names = [
         # "HavenToday.org",
         # "Player",
@@ -60,20 +31,18 @@ def main():
         "ElFaro90DayBibleChallenge"
     ]
 
-    client = AnalyticsConnection()
-    for idx, report_item in enumerate(reports):
-        category = report_item["category"]
-        name = report_item["name"]
-
-        print(f"Downloading {category}/{name} ({idx + 1} of {len(reports)})")
+    registry = ReportRegistry()
 
-        report = Report(from_json_file_name=f"reports/{category}/{name}.json")
-        # print(report)
-        # df = client.getAllData(report)
+    client = AnalyticsConnection()
+    for idx, (category, name, report) in enumerate(registry):
+        print(f"Downloading {category}/{name} ({idx + 1} of {len(registry)})")
 
         client.save_csv_chunks(view_names, report, name,
                                category, start_year=2018, end_year=2023)
-        # df.to_csv(f"data/{category}/{name}.csv")
+
+        if "date" in report.dimensions:
+            print(f"Updating rollups for {category}/{name}")
+            Rollup(category, name, report=report).update(view_names)
 
 
 if __name__ == '__main__':
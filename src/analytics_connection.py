@@ -5,9 +5,9 @@ and saving functionalities.
 
 Dependencies:
 - googleapiclient.discovery
-- oauth2client.service_account
 - pandas
 - dotenv
+- src.credentials.CredentialsProvider, get_default_provider
 - src.report.Report
 - src.date_utils.Day, Month, Year, dateLoop
 """
@@ -19,11 +19,11 @@ import time
 # import signal
 
 from googleapiclient.discovery import build
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from dotenv import load_dotenv
 # import tenacity
 
+from src.credentials import CredentialsProvider, get_default_provider
 from src.report import Report
 from src.date_utils import Day, Month, Year, dateLoop
 
@@ -47,25 +47,18 @@ class AnalyticsConnection:
     A class to handle connections to Google Analytics Reporting API and retrieve analytics data.
     """
 
-    def __init__(self):
+    def __init__(self, credentials_provider: CredentialsProvider = None):
         """
         Initializes the AnalyticsConnection with Google Analytics service account credentials.
+
+        Args:
+            credentials_provider (CredentialsProvider, optional): The provider of the service
+                account credentials. Defaults to the provider shared by every connection in
+                this process, whose access token is also shared with other processes.
         """
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict({
-            "type": "service_account",
-            "project_id": os.environ["PROJECT_ID"],
-            "private_key_id": os.environ["PRIVATE_KEY_ID"],
-            "private_key": os.environ["PRIVATE_KEY"],
-            "client_email": os.environ["CLIENT_EMAIL"],
-            "client_id": os.environ["CLIENT_ID"],
-            "auth_uri": os.environ["AUTH_URI"],
-            "token_uri": os.environ["TOKEN_URI"],
-            "auth_provider_x509_cert_url": os.environ["AUTH_PROVIDER_X509_CERT_URL"],
-            "client_x509_cert_url": os.environ["CLIENT_X509_CERT_URL"],
-            "universe_domain": "googleapis.com"
-        })
+        self.credentials_provider = credentials_provider or get_default_provider()
         self.client = build('analyticsreporting', 'v4',
-                            credentials=credentials)
+                            credentials=self.credentials_provider.get_credentials())
         self.views = {
             "HavenToday.org": os.environ["HAVENTODAY_ORG_VIEW_ID"],
             "Player": os.environ["PLAYER_VIEW_ID"],
@@ -149,6 +142,8 @@ class AnalyticsConnection:
 
                 try:
                     # signal.alarm(timeout_seconds)
+                    # Refreshes the shared access token ahead of its expiry
+                    self.credentials_provider.get_credentials()
                     # pylint: disable=no-member
                     response = self.client.reports().batchGet(body=body).execute()
 
@@ -0,0 +1,266 @@
+"""
+This module provides the CredentialsProvider class, which builds the Google
+Analytics service account credentials once per process and shares their OAuth
+access token with every other process on the host through a file cache.
+
+The cache only holds the access token and its expiry, never the private key.
+It is guarded by a file lock, so when many workers or notebook kernels start
+at once only one of them fetches a token and the others reuse it. Tokens are
+refreshed a few minutes before they expire, again by a single process.
+
+Example usage:
+--------------
+provider = get_default_provider()
+credentials = provider.get_credentials()
+
+Dependencies:
+- httplib2
+- oauth2client
+- dotenv
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import copy
+import json
+import os
+import threading
+
+import httplib2
+from oauth2client.client import Storage
+from oauth2client.service_account import ServiceAccountCredentials
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+load_dotenv()
+
+SCOPES = ["https://www.googleapis.com/auth/analytics.readonly"]
+
+DEFAULT_CACHE_FILE_NAME = os.path.join(
+    os.path.expanduser("~"), ".cache", "ga-historical-data", "token.json")
+
+EXPIRY_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def utc_now() -> datetime:
+    """
+    Returns the current time as a naive UTC datetime, the form oauth2client uses for token expiry.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@contextmanager
+def file_lock(file_name: str):
+    """
+    Holds an exclusive lock on a file for the duration of the block, blocking until it is available.
+
+    Args:
+        file_name (str): The lock file, created if it does not exist.
+    """
+    with open(file_name, "a+", encoding="utf-8") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class TokenCacheStorage(Storage):
+    """
+    An oauth2client Storage that shares the access token of a set of credentials
+    through a locked JSON file.
+
+    oauth2client calls locked_get under the lock before refreshing a token and
+    locked_put after fetching a new one, so a token refreshed by one process is
+    picked up by all others instead of each fetching their own.
+    """
+
+    def __init__(self, file_name: str, credentials: ServiceAccountCredentials,
+                 refresh_margin: timedelta):
+        """
+        Constructs the TokenCacheStorage object.
+
+        Args:
+            file_name (str): The token cache file.
+            credentials (ServiceAccountCredentials): The credentials whose token is cached.
+            refresh_margin (timedelta): How long before expiry a token is considered stale.
+        """
+        super().__init__(lock=threading.Lock())
+        self._file_name = file_name
+        self._credentials = credentials
+        self._refresh_margin = refresh_margin
+        self._key = f'{credentials.service_account_email} {" ".join(sorted(SCOPES))}'
+        self._file_lock = None
+
+    def acquire_lock(self):
+        """
+        Acquires the thread lock and then the file lock shared with other processes.
+        """
+        super().acquire_lock()
+        directory = os.path.dirname(self._file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._file_lock = file_lock(f"{self._file_name}.lock")
+        self._file_lock.__enter__()
+
+    def release_lock(self):
+        """
+        Releases the file lock and then the thread lock.
+        """
+        self._file_lock.__exit__(None, None, None)
+        self._file_lock = None
+        super().release_lock()
+
+    def locked_get(self):
+        """
+        Returns a copy of the credentials holding the cached token, or None if there is
+        no cached token or it expires within the refresh margin.
+        """
+        entry = self._read().get(self._key)
+        if entry is None:
+            return None
+
+        token_expiry = datetime.strptime(entry["token_expiry"], EXPIRY_FORMAT)
+        if token_expiry - self._refresh_margin <= utc_now():
+            return None
+
+        credentials = copy.copy(self._credentials)
+        credentials.access_token = entry["access_token"]
+        credentials.token_expiry = token_expiry - self._refresh_margin
+        credentials.invalid = False
+        return credentials
+
+    def locked_put(self, credentials):
+        """
+        Writes the token of freshly refreshed credentials to the cache. The credentials
+        are then marked to expire early so they are refreshed before the real expiry.
+        """
+        cache = self._read()
+        cache[self._key] = {
+            "access_token": credentials.access_token,
+            "token_expiry": credentials.token_expiry.strftime(EXPIRY_FORMAT),
+        }
+        self._write(cache)
+        credentials.token_expiry -= self._refresh_margin
+
+    def locked_delete(self):
+        """
+        Removes the token of the credentials from the cache.
+        """
+        cache = self._read()
+        cache.pop(self._key, None)
+        self._write(cache)
+
+    def _read(self) -> dict:
+        """
+        Reads the token cache, treating a missing or unreadable file as empty.
+        """
+        try:
+            with open(self._file_name, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, cache: dict):
+        """
+        Replaces the token cache atomically, readable by the current user only.
+        """
+        temp_file_name = f"{self._file_name}.{os.getpid()}.tmp"
+        file_descriptor = os.open(temp_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            json.dump(cache, file)
+        os.replace(temp_file_name, self._file_name)
+
+
+class CredentialsProvider:
+    """
+    A class to build the service account credentials once and keep their access token
+    fresh through a token cache shared by every process on the host.
+
+    Attributes:
+    ----------
+    cache_file_name : str
+        The token cache file.
+    refresh_margin : timedelta
+        How long before expiry a token is refreshed.
+
+    Methods:
+    -------
+    get_credentials() -> ServiceAccountCredentials:
+        Returns the credentials, refreshing their token first if it is about to expire.
+    """
+
+    def __init__(self, cache_file_name: str = None, refresh_margin=timedelta(minutes=5)):
+        """
+        Constructs all the necessary attributes for the CredentialsProvider object.
+
+        Args:
+            cache_file_name (str, optional): The token cache file. Defaults to the
+                GA_TOKEN_CACHE environment variable or ~/.cache/ga-historical-data/token.json.
+            refresh_margin (timedelta, optional): How long before expiry a token is
+                refreshed. Defaults to 5 minutes.
+        """
+        self.cache_file_name = cache_file_name or os.environ.get(
+            "GA_TOKEN_CACHE", DEFAULT_CACHE_FILE_NAME)
+        self.refresh_margin = refresh_margin
+        self._credentials = None
+        self._lock = threading.Lock()
+
+    def get_credentials(self) -> ServiceAccountCredentials:
+        """
+        Returns the credentials, refreshing their token first if it is missing or about
+        to expire. The refresh reuses a token cached by another process when there is one.
+
+        Returns:
+            ServiceAccountCredentials: Credentials with a valid access token.
+        """
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = ServiceAccountCredentials.from_json_keyfile_dict({
+                    "type": "service_account",
+                    "project_id": os.environ["PROJECT_ID"],
+                    "private_key_id": os.environ["PRIVATE_KEY_ID"],
+                    "private_key": os.environ["PRIVATE_KEY"],
+                    "client_email": os.environ["CLIENT_EMAIL"],
+                    "client_id": os.environ["CLIENT_ID"],
+                    "auth_uri": os.environ["AUTH_URI"],
+                    "token_uri": os.environ["TOKEN_URI"],
+                    "auth_provider_x509_cert_url": os.environ["AUTH_PROVIDER_X509_CERT_URL"],
+                    "client_x509_cert_url": os.environ["CLIENT_X509_CERT_URL"],
+                    "universe_domain": "googleapis.com"
+                }, scopes=SCOPES)
+                self._credentials.set_store(TokenCacheStorage(
+                    self.cache_file_name, self._credentials, self.refresh_margin))
+
+            if not self._credentials.access_token or self._credentials.access_token_expired:
+                self._credentials.refresh(httplib2.Http())
+
+            return self._credentials
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_default_provider() -> CredentialsProvider:
+    """
+    Returns the CredentialsProvider shared by every AnalyticsConnection in this process.
+    """
+    global _default_provider  # pylint: disable=global-statement
+    with _default_provider_lock:
+        if _default_provider is None:
+            _default_provider = CredentialsProvider()
+        return _default_provider
@@ -0,0 +1,365 @@
+"""
+This module provides the Query class for answering ad-hoc questions over the
+CSV chunks written by AnalyticsConnection.save_csv_chunks, without loading a
+whole table into memory or uploading it to a database first.
+
+Data is laid out as ./data/{category}/{table_name}/{view}_{year}.csv. A query
+only opens the (view, year) partitions that can match its view and date
+filters, reads only the columns it needs, applies its filters to each chunk as
+it is scanned and keeps nothing but partial aggregates between chunks.
+
+Example usage:
+--------------
+# Sessions by view for landing pages in Q2 2022
+query = Query("behavior", "landing_pages")
+df = query.run(start_date="2022-04-01",
+               end_date="2022-06-30",
+               group_by=["view_name"],
+               aggregates={"sessions": "sum"})
+
+Dependencies:
+- pandas
+- src.report.Report
+"""
+
+from datetime import datetime
+from typing import Dict, List
+import os
+import re
+import warnings
+
+import pandas as pd
+
+from src.report import Report
+
+# Columns that can be grouped by without being stored in the CSV files
+DERIVED_COLUMNS = ["view_name", "year", "quarter", "month", "week"]
+
+# How each aggregate is computed per chunk and then combined across chunks
+AGGREGATES = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "min": ["min"],
+    "max": ["max"],
+    "mean": ["sum", "count"],
+}
+COMBINERS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+FILTER_OPERATORS = ["EXACT", "BEGINS_WITH", "ENDS_WITH",
+                    "PARTIAL", "REGEXP", "IN_LIST"]
+
+# Partial aggregates are combined once this many rows, or twice the size of the
+# last combined result if that is larger, are waiting to be merged
+MAX_PENDING_ROWS = 1_000_000
+
+
+def to_date_key(value) -> str:
+    """
+    Converts a date into the YYYYMMDD form used by the ga:date column.
+
+    Args:
+        value (str | datetime): A "YYYY-MM-DD" string, a "YYYYMMDD" string or a datetime.
+
+    Returns:
+        str: The date as YYYYMMDD.
+    """
+    if isinstance(value, datetime):
+        return value.strftime("%Y%m%d")
+    return str(value).replace("-", "")
+
+
+class Query:
+    """
+    A class to run filtered, grouped and aggregated queries over the downloaded
+    CSV chunks of a single report.
+
+    Attributes:
+    ----------
+    category : str
+        The category folder of the report (e.g. "behavior").
+    table_name : str
+        The table folder of the report (e.g. "landing_pages").
+    report : Report
+        The report definition the CSV files were downloaded with.
+    directory : str
+        The folder holding the {view}_{year}.csv partitions.
+
+    Methods:
+    -------
+    partitions(views=None, start_date=None, end_date=None) -> List[dict]:
+        Lists the partitions a query would need to open.
+    run(...) -> pd.DataFrame:
+        Runs the query and returns the aggregated result.
+    """
+
+    def __init__(self,
+                 category: str,
+                 table_name: str,
+                 data_dir: str = "./data",
+                 reports_dir: str = "./reports",
+                 report: Report = None):
+        """
+        Constructs all the necessary attributes for the Query object.
+
+        Parameters:
+        ----------
+        category : str
+            The category folder of the report (e.g. "behavior").
+        table_name : str
+            The table folder of the report (e.g. "landing_pages").
+        data_dir : str, optional
+            The root folder of the downloaded data (default is "./data").
+        reports_dir : str, optional
+            The root folder of the report definitions (default is "./reports").
+        report : Report, optional
+            The report definition, e.g. from a ReportRegistry. Read from reports_dir
+            if not given (default is None).
+        """
+        self.category = category
+        self.table_name = table_name
+        self.report = report if report is not None else Report(
+            from_json_file_name=f"{reports_dir}/{category}/{table_name}.json")
+        self.directory = f"{data_dir}/{category}/{table_name}"
+
+    def partitions(self, views: List[str] = None, start_date=None, end_date=None) -> List[dict]:
+        """
+        Lists the (view, year) partitions that can hold rows matching the given filters.
+
+        Args:
+            views (List[str], optional): Only include these views. Defaults to all views.
+            start_date (str | datetime, optional): Only include years on or after this date.
+            end_date (str | datetime, optional): Only include years on or before this date.
+
+        Returns:
+            List[dict]: The matching partitions as {"view_name", "year", "path"} dicts.
+        """
+        start_year = int(to_date_key(start_date)[:4]) if start_date else None
+        end_year = int(to_date_key(end_date)[:4]) if end_date else None
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        partitions = []
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            match = re.fullmatch(r"(.+)_(\d{4})\.csv", filename)
+            if not os.path.isfile(path) or match is None:
+                continue
+
+            view_name, year = match.group(1), int(match.group(2))
+            if views is not None and view_name not in views:
+                continue
+            if start_year is not None and year < start_year:
+                continue
+            if end_year is not None and year > end_year:
+                continue
+
+            partitions.append(
+                {"view_name": view_name, "year": year, "path": path})
+        return partitions
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def run(self,
+            views: List[str] = None,
+            start_date=None,
+            end_date=None,
+            filters: List[dict] = None,
+            filter_operator: str = "AND",
+            group_by: List[str] = None,
+            aggregates: Dict[str, str] = None,
+            chunksize: int = 100_000) -> pd.DataFrame:
+        """
+        Runs the query over the matching partitions.
+
+        Args:
+            views (List[str], optional): Only include these views. Defaults to all views.
+            start_date (str | datetime, optional): Only include rows on or after this date.
+            end_date (str | datetime, optional): Only include rows on or before this date.
+            filters (List[dict], optional): Dimension filters in the same format as the
+                "filters" of a report definition, i.e. {"dimension", "operator",
+                "expressions", "not"}. Supported operators are EXACT, BEGINS_WITH,
+                ENDS_WITH, PARTIAL, REGEXP and IN_LIST.
+            filter_operator (str, optional): How filters are combined, "AND" or "OR".
+                Defaults to "AND".
+            group_by (List[str], optional): Dimensions of the report and/or view_name,
+                year, quarter, month or week to group by. Weeks are keyed by the date
+                of their Monday. Defaults to no grouping.
+            aggregates (Dict[str, str], optional): Metric name to one of sum, count,
+                min, max or mean. Defaults to the sum of every metric of the report.
+            chunksize (int, optional): The number of rows read from a file at a time.
+                Defaults to 100,000.
+
+        Returns:
+            pd.DataFrame: One row per group with a column per aggregated metric.
+        """
+        group_by = list(group_by) if group_by else []
+        aggregates = dict(aggregates) if aggregates else {
+            metric: "sum" for metric in self.report.metrics}
+        filters = list(filters) if filters else []
+
+        assert filter_operator in ["AND", "OR"], \
+            "Filter operator must be one of the following: AND, OR"
+        for column in group_by:
+            assert column in self.report.dimensions or column in DERIVED_COLUMNS, \
+                f"Cannot group by {column}, must be a dimension of the report or one of: " + \
+                ", ".join(DERIVED_COLUMNS)
+        for metric, aggregate in aggregates.items():
+            assert metric in self.report.metrics, f"{metric} is not a metric of the report"
+            assert aggregate in AGGREGATES, "Aggregate must be one of the following: " + \
+                ", ".join(AGGREGATES.keys())
+        for filter_item in filters:
+            assert filter_item["dimension"] in self.report.dimensions, \
+                f"Cannot filter on {filter_item['dimension']}, it is not a dimension of the report"
+            assert filter_item["operator"] in FILTER_OPERATORS, \
+                "Filter operator must be one of the following: " + ", ".join(FILTER_OPERATORS)
+
+        # Regular expressions are compiled once rather than for every chunk
+        filters = [{**filter_item, "pattern": re.compile(filter_item["expressions"][0])}
+                   if filter_item["operator"] == "REGEXP" else filter_item
+                   for filter_item in filters]
+
+        start_key = to_date_key(start_date) if start_date else None
+        end_key = to_date_key(end_date) if end_date else None
+        needs_date = start_key is not None or end_key is not None or \
+            any(column in ["quarter", "month", "week"] for column in group_by)
+        assert not needs_date or "date" in self.report.dimensions, \
+            "Date ranges and quarter, month or week grouping need a report with a date dimension"
+
+        dimensions = {column for column in group_by if column in self.report.dimensions}
+        dimensions |= {filter_item["dimension"] for filter_item in filters}
+        if needs_date:
+            dimensions.add("date")
+        columns = [f"ga:{dimension}" for dimension in sorted(dimensions)] + \
+            [f"ga:{metric}" for metric in aggregates]
+        dtypes = {f"ga:{dimension}": "object" for dimension in dimensions}
+
+        partial_aggregates = {f"{metric}__{partial}": (metric, partial)
+                              for metric, aggregate in aggregates.items()
+                              for partial in AGGREGATES[aggregate]}
+        combiners = {name: (name, COMBINERS[name.rsplit("__", 1)[1]])
+                     for name in partial_aggregates}
+        partials = []
+        pending_rows = 0
+        merged_rows = 0
+
+        for partition in self.partitions(views, start_date, end_date):
+            try:
+                reader = pd.read_csv(partition["path"], usecols=columns,
+                                     dtype=dtypes, chunksize=chunksize)
+            except pd.errors.EmptyDataError:
+                # Years without data are saved as empty files
+                continue
+
+            with reader:
+                for chunk in reader:
+                    chunk.columns = chunk.columns.str.replace("ga:", "", regex=False)
+
+                    mask = pd.Series(True, index=chunk.index)
+                    if start_key is not None:
+                        mask &= chunk["date"] >= start_key
+                    if end_key is not None:
+                        mask &= chunk["date"] <= end_key
+                    if filters:
+                        mask &= self._filter_mask(chunk, filters, filter_operator)
+                    chunk = chunk[mask]
+                    if chunk.empty:
+                        continue
+
+                    chunk = chunk.assign(view_name=partition["view_name"],
+                                         year=partition["year"])
+                    if "quarter" in group_by:
+                        chunk["quarter"] = chunk["date"].str[:4] + "-Q" + \
+                            ((chunk["date"].str[4:6].astype(int) - 1) // 3 + 1).astype(str)
+                    if "month" in group_by:
+                        chunk["month"] = chunk["date"].str[:4] + "-" + chunk["date"].str[4:6]
+                    if "week" in group_by:
+                        # Weeks are keyed by the date of their Monday
+                        dates = pd.to_datetime(chunk["date"], format="%Y%m%d")
+                        chunk["week"] = (dates - pd.to_timedelta(dates.dt.weekday, unit="D")) \
+                            .dt.strftime("%Y-%m-%d")
+
+                    partial = self._aggregate(chunk, group_by, partial_aggregates)
+                    partials.append(partial)
+                    pending_rows += len(partial)
+
+                    # Waiting for twice the last merged size keeps the merge work linear
+                    # even when there are more groups than MAX_PENDING_ROWS
+                    if pending_rows > max(MAX_PENDING_ROWS, 2 * merged_rows):
+                        partials = [self._aggregate(pd.concat(partials), group_by, combiners)]
+                        merged_rows = pending_rows = len(partials[0])
+
+        if not partials:
+            result = pd.DataFrame(columns=group_by + list(partial_aggregates))
+        elif len(partials) == 1:
+            result = partials[0]
+        else:
+            result = self._aggregate(pd.concat(partials), group_by, combiners)
+
+        output = result[group_by].copy()
+        for metric, aggregate in aggregates.items():
+            if aggregate == "mean":
+                output[metric] = result[f"{metric}__sum"] / result[f"{metric}__count"]
+            else:
+                output[metric] = result[f"{metric}__{aggregate}"]
+        return output.sort_values(group_by).reset_index(drop=True) if group_by else output
+
+    @staticmethod
+    def _aggregate(df: pd.DataFrame, group_by: List[str], named_aggregates: dict) -> pd.DataFrame:
+        """
+        Aggregates a DataFrame, with or without grouping.
+
+        Args:
+            df (pd.DataFrame): The rows to aggregate.
+            group_by (List[str]): The columns to group by, may be empty.
+            named_aggregates (dict): Output column name to (input column, function).
+
+        Returns:
+            pd.DataFrame: The aggregated rows with the group_by columns as regular columns.
+        """
+        if group_by:
+            return df.groupby(group_by, as_index=False, dropna=False).agg(**named_aggregates)
+        return pd.DataFrame([{name: df[column].agg(function)
+                              for name, (column, function) in named_aggregates.items()}])
+
+    @staticmethod
+    def _filter_mask(chunk: pd.DataFrame, filters: List[dict], filter_operator: str) -> pd.Series:
+        """
+        Evaluates dimension filters against a chunk of rows.
+
+        Args:
+            chunk (pd.DataFrame): The rows to evaluate.
+            filters (List[dict]): The dimension filters, with REGEXP filters holding their
+                compiled "pattern".
+            filter_operator (str): How filters are combined, "AND" or "OR".
+
+        Returns:
+            pd.Series: True for every row that matches the filters.
+        """
+        masks = []
+        for filter_item in filters:
+            values = chunk[filter_item["dimension"]].fillna("")
+            expressions = filter_item["expressions"]
+            operator = filter_item["operator"]
+
+            if operator == "IN_LIST":
+                mask = values.isin(expressions)
+            elif operator == "EXACT":
+                mask = values == expressions[0]
+            elif operator == "BEGINS_WITH":
+                mask = values.str.startswith(expressions[0])
+            elif operator == "ENDS_WITH":
+                mask = values.str.endswith(expressions[0])
+            elif operator == "PARTIAL":
+                mask = values.str.contains(expressions[0], regex=False)
+            else:
+                # pandas warns when a pattern has groups, e.g. "(Other)", but they are harmless
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", UserWarning)
+                    mask = values.str.contains(filter_item["pattern"])
+
+            masks.append(~mask if filter_item.get("not", False) else mask)
+
+        combined = masks[0]
+        for mask in masks[1:]:
+            combined = combined & mask if filter_operator == "AND" else combined | mask
+        return combined
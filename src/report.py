@@ -9,6 +9,8 @@ Classes:
 --------
 Report:
     Represents a report configuration and provides methods to generate report requests.
+ReportTemplate:
+    An immutable, compiled report request that only needs a view and date range filled in.
 
 Example usage:
 --------------
@@ -55,13 +57,16 @@ class Report:
 
     Methods:
     -------
+    compile() -> ReportTemplate:
+        Validates the report configuration and compiles it into a request template.
     generate(view_id: str, start_date: str = "2000-01-01", end_date: str = "2023-07-01") -> dict:
         Generates the report request dictionary.
     __str__():
         Returns a string representation of the report.
     """
 
-    def __init__(self, from_json_file_name: str = None, page_size: int = 10_000):
+    def __init__(self, from_json_file_name: str = None, page_size: int = 10_000,
+                 from_dict: dict = None):
         """
         Constructs all the necessary attributes for the Report object.
 
@@ -71,8 +76,11 @@ class Report:
             The file name of the JSON file to load the report configuration from (default is None).
         page_size : int, optional
             The number of rows per page in the report (default is 10,000).
+        from_dict : dict, optional
+            An already loaded report configuration, used instead of reading a JSON file
+            (default is None).
         """
-        data = None
+        data = from_dict
 
         if from_json_file_name is not None:
             with open(from_json_file_name, encoding="utf-8") as file:
@@ -93,6 +101,48 @@ class Report:
                 "day", "month", "year"], "Chunk by must be one of the following: day, month, year"
 
         self.chunk_by = data["chunkBy"] if "chunkBy" in data else None
+        self._template = None
+
+    def compile(self) -> "ReportTemplate":
+        """
+        Validates the report configuration and compiles it into a request template.
+        The template is built once and reused by every later call.
+
+        Returns:
+        -------
+        ReportTemplate
+            The compiled request template.
+        """
+        if self._template is not None:
+            return self._template
+
+        assert self.dimensions is not None, "Dimensions must be specified"
+        assert self.metrics is not None, "Metrics must be specified"
+
+        if self.filters:
+            assert self.filter_operator is not None, \
+                "Filter operator must be specified if filters are specified"
+            for filter_item in self.filters:
+                assert "dimension" in filter_item, "Filter dimension must be specified"
+                assert "operator" in filter_item, "Filter operator must be specified"
+                assert "expressions" in filter_item, "Filter expressions must be specified"
+                assert isinstance(filter_item["expressions"], list), \
+                    "Filter expressions must be a list of strings"
+
+        filters = tuple(
+            (f"ga:{filter_item['dimension']}",
+             tuple(filter_item["expressions"]),
+             filter_item["operator"],
+             filter_item["not"] if "not" in filter_item else False)
+            for filter_item in self.filters) if self.filters else ()
+
+        self._template = ReportTemplate(
+            metrics=tuple(f"ga:{metric}" for metric in self.metrics),
+            dimensions=tuple(f"ga:{dimension}" for dimension in self.dimensions),
+            filters=filters,
+            filter_operator=self.filter_operator if self.filter_operator else "AND",
+            page_size=self.page_size)
+        return self._template
 
     def generate(self, view_id: str, start_date="2000-01-01", end_date="2023-07-01") -> dict:
         """
@@ -115,44 +165,11 @@ class Report:
         assert view_id is not None, "View ID must be specified"
         assert start_date is not None, "Start date must be specified"
         assert end_date is not None, "End date must be specified"
-        assert self.dimensions is not None, "Dimensions must be specified"
-        assert self.metrics is not None, "Metrics must be specified"
 
-        if self.filters:
-            assert self.filter_operator is not None, \
-                "Filter operator must be specified if filters are specified"
-            for filter_item in self.filters:
-                assert "dimension" in filter_item, "Filter dimension must be specified"
-                assert "operator" in filter_item, "Filter operator must be specified"
-                assert "expressions" in filter_item, "Filter expressions must be specified"
         self.start_date = start_date
         self.end_date = end_date
 
-        report_request = {
-            "viewId": view_id,
-            "dateRanges": [{"startDate": start_date, "endDate": end_date}],
-            "metrics": [{"expression": f"ga:{metric}"} for metric in self.metrics],
-            "dimensions": [{"name": f"ga:{dimension}"} for dimension in self.dimensions],
-        }
-
-        if self.filters:
-            filters = []
-            for filter_item in self.filters:
-                filters.append({
-                    "dimensionName": f"ga:{filter_item['dimension']}",
-                    "expressions": filter_item["expressions"],
-                    "operator": filter_item["operator"],
-                    "not": filter_item["not"] if "not" in filter_item else False
-                })
-            report_request["dimensionFilterClauses"] = [{
-                "filters": filters,
-                "operator": self.filter_operator if self.filter_operator else "AND"
-            }]
-
-        report_request['pageSize'] = self.page_size
-        report_request['samplingLevel'] = 'LARGE'
-
-        return {"reportRequests": [report_request]}
+        return self.compile().render(view_id, start_date, end_date)
 
     def __str__(self):
         """
@@ -218,3 +235,89 @@ class Report:
         result = f"{border}\n{content}\n{border}"
 
         return result
+
+
+class ReportTemplate:
+    """
+    An immutable, pre-validated report request where only the view and date range
+    are filled in per request.
+
+    The template only holds strings, numbers and tuples of them. Every call to
+    render builds new dictionaries and lists, so changing a rendered request
+    never affects the template or any other request.
+
+    Methods:
+    -------
+    render(view_id: str, start_date: str, end_date: str) -> dict:
+        Generates the report request dictionary for a view and date range.
+    """
+    __slots__ = ("metrics", "dimensions", "filters", "filter_operator", "page_size")
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, metrics: tuple, dimensions: tuple, filters: tuple,
+                 filter_operator: str, page_size: int):
+        """
+        Constructs the ReportTemplate object.
+
+        Parameters:
+        ----------
+        metrics : tuple
+            The metric expressions, e.g. "ga:sessions".
+        dimensions : tuple
+            The dimension names, e.g. "ga:date".
+        filters : tuple
+            The dimension filters as (dimensionName, expressions, operator, not) tuples.
+        filter_operator : str
+            The operator for combining filters.
+        page_size : int
+            The number of rows per page in the report.
+        """
+        object.__setattr__(self, "metrics", metrics)
+        object.__setattr__(self, "dimensions", dimensions)
+        object.__setattr__(self, "filters", filters)
+        object.__setattr__(self, "filter_operator", filter_operator)
+        object.__setattr__(self, "page_size", page_size)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ReportTemplate is immutable")
+
+    def render(self, view_id: str, start_date: str, end_date: str) -> dict:
+        """
+        Generates the report request dictionary for a view and date range.
+
+        Parameters:
+        ----------
+        view_id : str
+            The ID of the view for which the report is generated.
+        start_date : str
+            The start date for the report.
+        end_date : str
+            The end date for the report.
+
+        Returns:
+        -------
+        dict
+            The report request dictionary.
+        """
+        report_request = {
+            "viewId": view_id,
+            "dateRanges": [{"startDate": start_date, "endDate": end_date}],
+            "metrics": [{"expression": metric} for metric in self.metrics],
+            "dimensions": [{"name": dimension} for dimension in self.dimensions],
+        }
+
+        if self.filters:
+            report_request["dimensionFilterClauses"] = [{
+                "filters": [{
+                    "dimensionName": dimension_name,
+                    "expressions": list(expressions),
+                    "operator": operator,
+                    "not": not_operator
+                } for dimension_name, expressions, operator, not_operator in self.filters],
+                "operator": self.filter_operator
+            }]
+
+        report_request['pageSize'] = self.page_size
+        report_request['samplingLevel'] = 'LARGE'
+
+        return {"reportRequests": [report_request]}
@@ -0,0 +1,221 @@
+"""
+This module provides the ReportRegistry class, which discovers every report
+definition under ./reports once, validates it against the bundled Google
+Analytics Reporting API v4 metadata catalogue (src/ga_metadata.json) and
+compiles it into a request template.
+
+Validation covers the API limits (10 metrics and 7 dimensions per request),
+unknown or duplicated metric and dimension names, and malformed filters. Every
+problem in every report is collected and raised together before any request
+is made, so a bad configuration never spends quota.
+
+A report with "enabled": false is skipped entirely: it is neither validated
+nor downloaded until someone opts in by removing the key or setting it to true.
+
+Example usage:
+--------------
+registry = ReportRegistry()
+for category, name, report in registry:
+    print(f"{category}/{name}: {report.name}")
+
+report = registry.get("acquisition", "channels")
+
+Dependencies:
+- src.report.Report
+"""
+
+from typing import Iterator, List, Tuple
+import glob
+import json
+import os
+
+from src.report import Report
+
+CATALOGUE_FILE_NAME = os.path.join(os.path.dirname(__file__), "ga_metadata.json")
+
+
+class ReportValidationError(Exception):
+    """
+    Raised when one or more report definitions are invalid.
+
+    Attributes:
+    ----------
+    errors : list
+        A description of every problem found.
+    """
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("Invalid report definitions:\n    - " + "\n    - ".join(errors))
+
+
+class ReportRegistry:
+    """
+    A class to discover, validate and compile all report definitions once.
+
+    Attributes:
+    ----------
+    reports_dir : str
+        The root folder of the report definitions.
+    catalogue : dict
+        The metadata catalogue with API limits, filter operators, dimensions and metrics.
+    disabled : list
+        The "category/name" of every report with "enabled": false.
+
+    Methods:
+    -------
+    get(category: str, name: str) -> Report:
+        Returns the compiled report for a category and name.
+    validate(key: str, data: dict) -> List[str]:
+        Lists the problems with a single report definition.
+    """
+
+    def __init__(self,
+                 reports_dir: str = "./reports",
+                 catalogue_file_name: str = CATALOGUE_FILE_NAME,
+                 page_size: int = 10_000):
+        """
+        Discovers, validates and compiles every enabled report definition.
+
+        Parameters:
+        ----------
+        reports_dir : str, optional
+            The root folder of the report definitions (default is "./reports").
+        catalogue_file_name : str, optional
+            The metadata catalogue to validate against (default is the bundled src/ga_metadata.json).
+        page_size : int, optional
+            The number of rows per page in every report (default is 10,000).
+
+        Raises:
+        ------
+        ReportValidationError
+            If any report definition is invalid.
+        """
+        self.reports_dir = reports_dir
+
+        with open(catalogue_file_name, encoding="utf-8") as file:
+            self.catalogue = json.load(file)
+
+        definitions = {}
+        self.disabled = []
+        for file_name in sorted(glob.glob(os.path.join(reports_dir, "**", "*.json"), recursive=True)):
+            relative_path = os.path.relpath(file_name, reports_dir)
+            key = os.path.splitext(relative_path)[0].replace(os.sep, "/")
+            with open(file_name, encoding="utf-8") as file:
+                data = json.load(file)
+
+            if data.get("enabled", True) is False:
+                self.disabled.append(key)
+            else:
+                definitions[key] = data
+
+        errors = []
+        for key, data in definitions.items():
+            errors.extend(self.validate(key, data))
+        if errors:
+            raise ReportValidationError(errors)
+
+        self._reports = {}
+        for key, data in definitions.items():
+            report = Report(from_dict=data, page_size=page_size)
+            report.compile()
+            self._reports[key] = report
+
+    def validate(self, key: str, data: dict) -> List[str]:
+        """
+        Lists the problems with a single report definition.
+
+        Parameters:
+        ----------
+        key : str
+            The "category/name" of the report, used in the error messages.
+        data : dict
+            The report definition as loaded from JSON.
+
+        Returns:
+        -------
+        List[str]
+            A description of every problem found, empty if the report is valid.
+        """
+        errors = []
+        limits = self.catalogue["limits"]
+
+        if not isinstance(data.get("enabled", True), bool):
+            errors.append(f"{key}: enabled must be true or false")
+
+        if data.get("chunkBy", "month") not in ["day", "month", "year"]:
+            errors.append(f"{key}: chunkBy must be one of the following: day, month, year")
+
+        for kind in ["metrics", "dimensions"]:
+            names = data.get(kind)
+            if not names:
+                errors.append(f"{key}: {kind} must be specified")
+                continue
+            if len(names) > limits[kind]:
+                errors.append(f"{key}: {len(names)} {kind} exceeds the API limit of {limits[kind]}")
+            for name in sorted(set(names)):
+                if name not in self.catalogue[kind]:
+                    errors.append(f"{key}: unknown {kind[:-1]} \"{name}\"")
+                if names.count(name) > 1:
+                    errors.append(f"{key}: {kind[:-1]} \"{name}\" is listed more than once")
+
+        filters = data.get("filters")
+        if filters:
+            if data.get("filterOperator") not in ["AND", "OR"]:
+                errors.append(f"{key}: filterOperator must be one of the following: AND, OR")
+            for idx, filter_item in enumerate(filters):
+                for field in ["dimension", "operator", "expressions"]:
+                    if field not in filter_item:
+                        errors.append(f"{key}: filter {idx + 1} must specify {field}")
+                if "dimension" in filter_item and filter_item["dimension"] not in self.catalogue["dimensions"]:
+                    errors.append(f"{key}: filter {idx + 1} has unknown dimension "
+                                  f"\"{filter_item['dimension']}\"")
+                if "operator" in filter_item and \
+                        filter_item["operator"] not in self.catalogue["filterOperators"]:
+                    errors.append(f"{key}: filter {idx + 1} has unknown operator "
+                                  f"\"{filter_item['operator']}\"")
+                if "expressions" in filter_item:
+                    expressions = filter_item["expressions"]
+                    if not isinstance(expressions, list) or not expressions or \
+                            not all(isinstance(expression, str) for expression in expressions):
+                        errors.append(f"{key}: filter {idx + 1} expressions must be a "
+                                      "non-empty list of strings")
+                if not isinstance(filter_item.get("not", False), bool):
+                    errors.append(f"{key}: filter {idx + 1} not must be true or false")
+
+        return errors
+
+    def get(self, category: str, name: str) -> Report:
+        """
+        Returns the compiled report for a category and name.
+
+        Parameters:
+        ----------
+        category : str
+            The category folder of the report (e.g. "acquisition").
+        name : str
+            The file name of the report without extension (e.g. "channels").
+
+        Returns:
+        -------
+        Report
+            The compiled report.
+        """
+        key = f"{category}/{name}"
+        assert key not in self.disabled, f"Report {key} is disabled"
+        assert key in self._reports, f"Report {key} not found in {self.reports_dir}"
+        return self._reports[key]
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Report]]:
+        """
+        Iterates over the reports in (category, name, report) tuples, sorted by category and name.
+        """
+        for key, report in self._reports.items():
+            category, name = key.rsplit("/", 1)
+            yield category, name, report
+
+    def __len__(self) -> int:
+        """
+        Returns the number of reports in the registry.
+        """
+        return len(self._reports)
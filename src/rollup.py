@@ -0,0 +1,412 @@
+"""
+This module provides the Rollup class for keeping pre-aggregated weekly,
+monthly and yearly tables of a date-keyed report next to its daily CSV chunks.
+
+Rollups are written to ./data/{category}/{table_name}/rollups/{view}_{grain}.csv.
+A manifest records the size and SHA-1 of every daily chunk the rollups were
+built from, so an update only recomputes the periods that overlap the (view,
+year) chunks whose content changed since the last run. Chunks that are
+rewritten with the same bytes, as save_csv_chunks does on every run, are left
+alone.
+
+Only metrics known to add up across days (counts and totals such as sessions
+or transactionRevenue) are summed. Every ratio whose components are summed,
+e.g. bounceRate from bounces and sessions, is then recomputed for each period,
+whether or not the report itself requests it. All other metrics, such as
+users or averages, do not add up across days and are left out of the rollups.
+
+Example usage:
+--------------
+rollup = Rollup("acquisition", "channels")
+rollup.update(["HavenToday.ca", "GetAnchor.com"])
+monthly = rollup.load("HavenToday.ca", "month")
+
+Dependencies:
+- pandas
+- src.query.Query
+- src.report.Report
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from src.query import Query
+from src.report import Report
+
+GRAINS = ["week", "month", "year"]
+
+# Ratio metric to (numerator, denominator, scale)
+RATIO_METRICS = {
+    "bounceRate": ("bounces", "sessions", 100),
+    "percentNewSessions": ("newUsers", "sessions", 100),
+    "transactionsPerSession": ("transactions", "sessions", 100),
+    "transactionRevenuePerSession": ("transactionRevenue", "sessions", 1),
+    "revenuePerTransaction": ("transactionRevenue", "transactions", 1),
+    "pageviewsPerSession": ("pageviews", "sessions", 1),
+    "avgSessionDuration": ("sessionDuration", "sessions", 1),
+    "entranceRate": ("entrances", "pageviews", 100),
+    "exitRate": ("exits", "pageviews", 100),
+    "revenuePerItem": ("itemRevenue", "itemQuantity", 1),
+    "itemsPerPurchase": ("itemQuantity", "uniquePurchases", 1),
+}
+
+# Metrics that add up across days. Anything else, such as users (a distinct
+# count) or an average, is left out unless it is a ratio in RATIO_METRICS
+ADDITIVE_METRICS = [
+    "newUsers",
+    "sessions",
+    "bounces",
+    "sessionDuration",
+    "hits",
+    "organicSearches",
+    "entrances",
+    "pageviews",
+    "uniquePageviews",
+    "timeOnPage",
+    "exits",
+    "searchResultViews",
+    "searchUniques",
+    "searchSessions",
+    "searchDepth",
+    "searchRefinements",
+    "searchDuration",
+    "searchExits",
+    "totalEvents",
+    "uniqueEvents",
+    "eventValue",
+    "sessionsWithEvent",
+    "transactions",
+    "transactionRevenue",
+    "transactionShipping",
+    "transactionTax",
+    "totalValue",
+    "itemQuantity",
+    "uniquePurchases",
+    "itemRevenue",
+    "localTransactionRevenue",
+    "localItemRevenue",
+    "productAddsToCart",
+    "productCheckouts",
+    "productDetailViews",
+    "productListClicks",
+    "productListViews",
+    "productRefunds",
+    "productRemovesFromCart",
+    "quantityAddedToCart",
+    "quantityCheckedOut",
+    "quantityRefunded",
+    "quantityRemovedFromCart",
+    "refundAmount",
+    "totalRefunds",
+    "goalStartsAll",
+    "goalCompletionsAll",
+    "goalValueAll",
+    "goalAbandonsAll",
+    "pageLoadTime",
+    "pageLoadSample",
+    "domainLookupTime",
+    "serverResponseTime",
+]
+
+
+def file_sha1(file_name: str) -> str:
+    """
+    Returns the SHA-1 of a file's content, read in blocks.
+
+    Args:
+        file_name (str): The file to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    sha1 = hashlib.sha1()
+    with open(file_name, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class Rollup:
+    """
+    A class to maintain weekly, monthly and yearly rollups of a date-keyed report.
+
+    Attributes:
+    ----------
+    query : Query
+        The query engine over the daily CSV chunks of the report.
+    dimensions : list
+        The dimensions of the report other than date.
+    metrics : list
+        The metrics of the report that are summed.
+    ratios : list
+        The ratio metrics recomputed from the summed metrics, whether or not the
+        report requests them.
+    excluded : list
+        The metrics of the report that do not add up across days and are not rolled up.
+    directory : str
+        The folder holding the rollup tables and the manifest.
+
+    Methods:
+    -------
+    update(views=None) -> Dict[str, List[int]]:
+        Recomputes the periods affected by daily chunks that changed since the last update.
+    rebuild(views=None) -> Dict[str, List[int]]:
+        Recomputes every period from scratch.
+    load(view_name: str, grain: str) -> pd.DataFrame:
+        Loads a rollup table.
+    """
+
+    def __init__(self,
+                 category: str,
+                 table_name: str,
+                 data_dir: str = "./data",
+                 reports_dir: str = "./reports",
+                 report: Report = None):
+        """
+        Constructs all the necessary attributes for the Rollup object.
+
+        Parameters:
+        ----------
+        category : str
+            The category folder of the report (e.g. "acquisition").
+        table_name : str
+            The table folder of the report (e.g. "channels").
+        data_dir : str, optional
+            The root folder of the downloaded data (default is "./data").
+        reports_dir : str, optional
+            The root folder of the report definitions (default is "./reports").
+        report : Report, optional
+            The report definition, e.g. from a ReportRegistry. Read from reports_dir
+            if not given (default is None).
+        """
+        self.query = Query(category, table_name, data_dir, reports_dir, report)
+        report = self.query.report
+
+        assert "date" in report.dimensions, "Only reports with a date dimension can be rolled up"
+
+        self.dimensions = [dimension for dimension in report.dimensions if dimension != "date"]
+        self.metrics = [metric for metric in report.metrics if metric in ADDITIVE_METRICS]
+        self.ratios = [ratio for ratio, (numerator, denominator, _) in RATIO_METRICS.items()
+                       if numerator in self.metrics and denominator in self.metrics]
+        self.excluded = [metric for metric in report.metrics
+                         if metric not in self.metrics and metric not in self.ratios]
+
+        self.directory = f"{self.query.directory}/rollups"
+        self.manifest_path = f"{self.directory}/_manifest.json"
+
+    def update(self, views: List[str] = None) -> Dict[str, List[int]]:
+        """
+        Recomputes the periods overlapping any daily chunk whose content was added,
+        changed or removed since the last update. Chunks whose size and modification
+        time are unchanged are not hashed again.
+
+        Args:
+            views (List[str], optional): Only update these views. Defaults to all views.
+
+        Returns:
+            Dict[str, List[int]]: The years that were recomputed for each view.
+        """
+        manifest = self._load_manifest()
+        current = {}
+        for partition in self.query.partitions(views):
+            filename = os.path.basename(partition["path"])
+            stat = os.stat(partition["path"])
+            previous = manifest.get(filename, {})
+            unchanged_file = previous.get("mtime_ns") == stat.st_mtime_ns and \
+                previous.get("size") == stat.st_size
+            current[filename] = {
+                "view_name": partition["view_name"],
+                "year": partition["year"],
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha1": previous["sha1"] if unchanged_file else file_sha1(partition["path"]),
+            }
+
+        changed = {}
+        for filename, entry in current.items():
+            previous = manifest.get(filename, {})
+            if (previous.get("size"), previous.get("sha1")) != (entry["size"], entry["sha1"]):
+                changed.setdefault(entry["view_name"], set()).add(entry["year"])
+        for filename, entry in list(manifest.items()):
+            if filename not in current and (views is None or entry["view_name"] in views):
+                changed.setdefault(entry["view_name"], set()).add(entry["year"])
+                del manifest[filename]
+
+        for view_name, years in changed.items():
+            print(f'{view_name}: Updating rollups for {", ".join(map(str, sorted(years)))}')
+            self._refresh(view_name, sorted(years))
+            manifest.update({filename: entry for filename, entry in current.items()
+                             if entry["view_name"] == view_name})
+            self._save_manifest(manifest)
+
+        # Chunks rewritten with the same content only need their modification time updated
+        if current and any(manifest.get(filename) != entry for filename, entry in current.items()):
+            manifest.update(current)
+            self._save_manifest(manifest)
+
+        return {view_name: sorted(years) for view_name, years in changed.items()}
+
+    def rebuild(self, views: List[str] = None) -> Dict[str, List[int]]:
+        """
+        Recomputes every period, ignoring the manifest.
+
+        Args:
+            views (List[str], optional): Only rebuild these views. Defaults to all views.
+
+        Returns:
+            Dict[str, List[int]]: The years that were recomputed for each view.
+        """
+        manifest = self._load_manifest()
+        self._save_manifest({filename: entry for filename, entry in manifest.items()
+                             if views is not None and entry["view_name"] not in views})
+
+        for filename in os.listdir(self.directory):
+            view_name, _, grain = filename[:-len(".csv")].rpartition("_")
+            if grain in GRAINS and (views is None or view_name in views):
+                os.remove(f"{self.directory}/{filename}")
+
+        return self.update(views)
+
+    def load(self, view_name: str, grain: str) -> pd.DataFrame:
+        """
+        Loads a rollup table.
+
+        Args:
+            view_name (str): The name of the view.
+            grain (str): One of week, month or year.
+
+        Returns:
+            pd.DataFrame: The rollup table, empty if it has not been built yet. Excluded
+                metrics are never included and ratios are recomputed, even for tables
+                built by an older version.
+        """
+        assert grain in GRAINS, "Grain must be one of the following: " + ", ".join(GRAINS)
+
+        path = f"{self.directory}/{view_name}_{grain}.csv"
+        columns = [grain] + self.dimensions + self.metrics
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=columns + self.ratios)
+
+        df = pd.read_csv(path, usecols=lambda column: column in columns,
+                         dtype={column: "object" for column in [grain] + self.dimensions})
+        return self._with_ratios(df)
+
+    def _refresh(self, view_name: str, years: List[int]):
+        """
+        Recomputes the weekly, monthly and yearly periods overlapping the given years.
+
+        Args:
+            view_name (str): The name of the view.
+            years (List[int]): The years whose daily chunks changed.
+        """
+        aggregates = {metric: "sum" for metric in self.metrics}
+        tables = {grain: [] for grain in GRAINS}
+
+        for year in years:
+            monthly = self.query.run(views=[view_name],
+                                     start_date=datetime(year, 1, 1),
+                                     end_date=datetime(year, 12, 31),
+                                     group_by=["month"] + self.dimensions,
+                                     aggregates=aggregates)
+            tables["month"].append(monthly)
+
+            # Monthly sums add up exactly to the year, so the year needs no second scan
+            yearly = monthly.assign(year=monthly["month"].str[:4]).drop(columns="month")
+            tables["year"].append(
+                yearly.groupby(["year"] + self.dimensions, as_index=False, dropna=False).sum())
+
+            # Weeks overlapping the start or end of the year also need the neighbouring years
+            first_day = datetime(year, 1, 1)
+            last_day = datetime(year, 12, 31)
+            tables["week"].append(
+                self.query.run(views=[view_name],
+                               start_date=first_day - timedelta(days=first_day.weekday()),
+                               end_date=last_day + timedelta(days=6 - last_day.weekday()),
+                               group_by=["week"] + self.dimensions,
+                               aggregates=aggregates))
+
+        for grain, frames in tables.items():
+            recomputed = pd.concat(frames, ignore_index=True)
+            recomputed = self._with_ratios(recomputed)
+            recomputed = recomputed.drop_duplicates(subset=[grain] + self.dimensions, keep="last")
+
+            existing = self.load(view_name, grain)
+            affected = self._affected_periods(grain, years)
+            existing = existing[~existing[grain].isin(affected)]
+
+            table = pd.concat([existing, recomputed], ignore_index=True) \
+                .sort_values([grain] + self.dimensions).reset_index(drop=True)
+
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            table.to_csv(f"{self.directory}/{view_name}_{grain}.csv", index=False)
+
+    def _with_ratios(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Recomputes the ratio metrics from their summed components.
+
+        Args:
+            df (pd.DataFrame): Rows with summed metrics.
+
+        Returns:
+            pd.DataFrame: The rows with a column per ratio metric.
+        """
+        for ratio in self.ratios:
+            numerator, denominator, scale = RATIO_METRICS[ratio]
+            df[ratio] = (df[numerator] / df[denominator] * scale).where(df[denominator] != 0, 0)
+        return df
+
+    @staticmethod
+    def _affected_periods(grain: str, years: List[int]) -> List[str]:
+        """
+        Lists the period keys of a grain that overlap the given years.
+
+        Args:
+            grain (str): One of week, month or year.
+            years (List[int]): The years whose daily chunks changed.
+
+        Returns:
+            List[str]: The period keys in the same format as the rollup tables.
+        """
+        periods = []
+        for year in years:
+            if grain == "year":
+                periods.append(str(year))
+            elif grain == "month":
+                periods.extend(f"{year}-{month:02d}" for month in range(1, 13))
+            else:
+                first_day = datetime(year, 1, 1)
+                monday = first_day - timedelta(days=first_day.weekday())
+                while monday <= datetime(year, 12, 31):
+                    periods.append(monday.strftime("%Y-%m-%d"))
+                    monday += timedelta(days=7)
+        return periods
+
+    def _load_manifest(self) -> dict:
+        """
+        Loads the manifest of daily chunks the rollups were built from.
+
+        Returns:
+            dict: Chunk file name to its view, year, modification time, size and SHA-1.
+        """
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_manifest(self, manifest: dict):
+        """
+        Saves the manifest of daily chunks the rollups were built from.
+
+        Args:
+            manifest (dict): Chunk file name to its view, year, modification time, size and SHA-1.
+        """
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        with open(self.manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=4)